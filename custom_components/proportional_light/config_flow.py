@@ -5,7 +5,21 @@ from homeassistant.core import callback
 from homeassistant.const import CONF_ENTITIES
 from homeassistant.helpers import selector
 
+from .utils import COLOR_MODES
+
 DOMAIN = "proportional_light"
+HUE_OFFSET_PREFIX = "hue_offset_"
+
+# Shared selector for all per-entity hue offset fields
+_HUE_OFFSET_SELECTOR = selector.NumberSelector(
+    selector.NumberSelectorConfig(
+        min=-180.0,
+        max=180.0,
+        step=1.0,
+        mode=selector.NumberSelectorMode.BOX,
+        unit_of_measurement="°"
+    )
+)
 
 def _is_colorable_entity(hass, entity_id: str) -> bool:
     """Check if an entity supports color (RGB/HS modes)."""
@@ -13,10 +27,8 @@ def _is_colorable_entity(hass, entity_id: str) -> bool:
     if not state:
         return False
     
-    supported_modes = state.attributes.get("supported_color_modes", [])
     # Check if entity supports any color modes that allow RGB/HS colors
-    colorable_modes = {"hs", "xy", "rgb", "rgbw", "rgbww"}
-    return any(mode in supported_modes for mode in colorable_modes)
+    return not COLOR_MODES.isdisjoint(state.attributes.get("supported_color_modes") or ())
 
 
 class ProportionalLightConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
@@ -59,13 +71,13 @@ class ProportionalLightOptionsFlow(config_entries.OptionsFlow):
 
         if user_input is not None:
             # Extract hue offsets from user input - only for colorable entities
-            new_hue_offsets = {}
-            for key, value in user_input.items():
-                if key.startswith("hue_offset_"):
-                    entity_id = key.replace("hue_offset_", "")
-                    # Only save hue offset if entity is colorable
-                    if _is_colorable_entity(self.hass, entity_id):
-                        new_hue_offsets[entity_id] = float(value)
+            # Only save hue offset if entity is colorable
+            new_hue_offsets = {
+                entity_id: float(user_input[key])
+                for entity_id in user_input[CONF_ENTITIES]
+                if (key := f"{HUE_OFFSET_PREFIX}{entity_id}") in user_input
+                and _is_colorable_entity(self.hass, entity_id)
+            }
             
             # Update the config entry data directly
             self.hass.config_entries.async_update_entry(
@@ -79,39 +91,21 @@ class ProportionalLightOptionsFlow(config_entries.OptionsFlow):
 
         # Build hue offset schema dynamically based on selected entities
         # Only show hue offset options for colorable entities
-        hue_offset_schema = {}
         colorable_entities = [entity_id for entity_id in entities if _is_colorable_entity(self.hass, entity_id)]
-        
-        for entity_id in colorable_entities:
-            # Use a more user-friendly field name
-            state = self.hass.states.get(entity_id)
-            friendly_name = state.attributes.get("friendly_name", entity_id) if state else entity_id
-            field_name = f"hue_offset_{entity_id}"
-            
-            # Create a descriptive field with the friendly name and description
-            hue_offset_schema[vol.Optional(field_name, default=hue_offsets.get(entity_id, 0.0))] = selector.NumberSelector(
-                selector.NumberSelectorConfig(
-                    min=-180.0,
-                    max=180.0,
-                    step=1.0,
-                    mode=selector.NumberSelectorMode.BOX,
-                    unit_of_measurement="°"
-                )
-            )
 
-        # Create organized schema with sections
+        # Create organized schema with the entity selector followed by the hue offsets
         schema_dict = {
             vol.Required(CONF_ENTITIES, default=entities): selector.EntitySelector(
                 selector.EntitySelectorConfig(
                     domain="light", multiple=True
                 )
             ),
+            **{
+                vol.Optional(f"{HUE_OFFSET_PREFIX}{entity_id}", default=hue_offsets.get(entity_id, 0.0)): _HUE_OFFSET_SELECTOR
+                for entity_id in colorable_entities
+            },
         }
         
-        # Add hue offset section if there are colorable entities
-        if hue_offset_schema:
-            schema_dict.update(hue_offset_schema)
-        
         schema = vol.Schema(schema_dict)
         
         # Create concise description for the options form
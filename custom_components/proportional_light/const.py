@@ -6,6 +6,12 @@ DOMAIN = "proportional_light"
 DEFAULT_NAME = "Proportional Light"
 PARALLEL_UPDATES = 1
 
+# Seconds to coalesce bursts of member state changes into one update
+STATE_CHANGE_DEBOUNCE = 0.05
+
+# Upper bound in seconds for ignoring member state changes caused by our own commands
+COMMAND_SUPPRESS_WINDOW = 0.2
+
 # Configuration keys
 CONF_ENTITIES = "entities"
 CONF_HUE_OFFSETS = "hue_offsets"
@@ -2,41 +2,92 @@
 from __future__ import annotations
 import asyncio
 import logging
-from typing import Any, Callable
+from typing import Any, Callable, Mapping
 
-from homeassistant.core import HomeAssistant, callback
+from homeassistant.core import HomeAssistant, State, callback
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.helpers.event import async_track_state_change_event
 from homeassistant.const import STATE_ON
-from homeassistant.components.light import ATTR_BRIGHTNESS, ColorMode
+from homeassistant.components.light import (
+    ATTR_BRIGHTNESS,
+    ATTR_COLOR_TEMP_KELVIN,
+    ATTR_HS_COLOR,
+    ATTR_RGB_COLOR,
+    ATTR_XY_COLOR,
+    ColorMode,
+    LightEntityFeature,
+)
 
-from .const import LOGGER_NAME, CONF_ENTITIES, CONF_HUE_OFFSETS
+from .const import (
+    LOGGER_NAME,
+    CONF_ENTITIES,
+    CONF_HUE_OFFSETS,
+    COMMAND_SUPPRESS_WINDOW,
+    STATE_CHANGE_DEBOUNCE,
+)
 from .utils import (
-    filter_valid_states,
-    get_on_states,
+    split_states,
     calculate_group_brightness,
     calculate_average_color,
     calculate_supported_features,
+    calculate_aggregated_features,
     calculate_proportional_brightness,
 )
 
 _LOGGER = logging.getLogger(LOGGER_NAME)
 
 
+def _active_hue_offsets(hue_offsets: dict[str, float]) -> dict[str, float]:
+    """Derive the offset table used per command, dropping zero offsets once at config time."""
+    return {entity_id: float(offset) for entity_id, offset in hue_offsets.items() if offset}
+
+
 class ProportionalLightCoordinator:
     """Coordinates state updates between member entities and the proportional light."""
     
+    # Color modes in order of preference, bound once for the color mode derivation
+    _HS = ColorMode.HS
+    _CT = ColorMode.COLOR_TEMP
+    _BR = ColorMode.BRIGHTNESS
+    
+    # Member attributes the group state is derived from; changes to anything
+    # else (context, last_updated, unrelated attributes) don't trigger a recompute
+    _TRACKED_ATTRS = (
+        ATTR_BRIGHTNESS,
+        ATTR_HS_COLOR,
+        ATTR_RGB_COLOR,
+        ATTR_XY_COLOR,
+        ATTR_COLOR_TEMP_KELVIN,
+        "color_temp",
+        "color_mode",
+        "supported_color_modes",
+        "supported_features",
+        "min_color_temp_kelvin",
+        "max_color_temp_kelvin",
+    )
+    
     def __init__(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
         """Initialize the coordinator."""
         self.hass = hass
         self.entry = entry
-        self._entities: list[str] = entry.data.get(CONF_ENTITIES, [])
-        self._hue_offsets: dict[str, float] = entry.data.get(CONF_HUE_OFFSETS, {})
-        _LOGGER.debug(f"Coordinator initialized with entities: {self._entities}")
-        _LOGGER.debug(f"Coordinator initialized with hue_offsets: {self._hue_offsets}")
-        self._update_callbacks: list[Callable[[], None]] = []
+        data = entry.data
+        self._entities: tuple[str, ...] = tuple(data.get(CONF_ENTITIES, []))
+        self._entities_set: frozenset[str] = frozenset(self._entities)
+        self._hue_offsets: dict[str, float] = _active_hue_offsets(data.get(CONF_HUE_OFFSETS, {}))
+        _LOGGER.debug("Coordinator initialized with entities: %s", self._entities)
+        _LOGGER.debug("Coordinator initialized with hue_offsets: %s", self._hue_offsets)
+        self._update_callbacks: set[Callable[[], None]] = set()
         self._unsub_update_listener = None
         self._unsub_state_listener = None
+        self._pending_handle: asyncio.TimerHandle | None = None
+        # Loop time until which listener-driven updates are folded into a running command
+        self._suppress_until: float | None = None
+        # Single recompute armed for the end of that window
+        self._settle_handle: asyncio.TimerHandle | None = None
+        # (states, on_states) of the members, valid until the next member state change
+        self._snapshot: tuple[list[State], list[State]] | None = None
+        # Observable outputs at the time of the last notification
+        self._last_signature: tuple | None = None
         
         # Current calculated state
         self._is_on: bool = False
@@ -48,6 +99,15 @@ class ProportionalLightCoordinator:
         self._supported_color_modes: set = {ColorMode.BRIGHTNESS, ColorMode.COLOR_TEMP}
         self._min_color_temp_kelvin: int | None = None
         self._max_color_temp_kelvin: int | None = None
+        self._aggregated_features = LightEntityFeature(0)
+        # (attributes, state) of each member and the calculate_supported_features
+        # result computed from them
+        self._supported_features_cache: tuple[
+            tuple[tuple[Mapping[str, Any], str], ...],
+            tuple[set[ColorMode], int | None, int | None],
+        ] | None = None
+        # Derived color mode, recomputed lazily whenever one of its inputs changed
+        self._active_color_mode: ColorMode | None = None
         
         # Group target color (what user set, without offsets applied)
         self._group_target_color: tuple[float, float] | None = None
@@ -58,13 +118,13 @@ class ProportionalLightCoordinator:
         self._brightness_proportions: dict[str, float] = {}
     
     @property
-    def entities(self) -> list[str]:
+    def entities(self) -> tuple[str, ...]:
         """Return the list of member entities."""
         return self._entities
     
     @property
     def hue_offsets(self) -> dict[str, float]:
-        """Return the hue offsets dictionary."""
+        """Return the hue offsets dictionary (only entities with a non-zero offset)."""
         return self._hue_offsets
     
     @property
@@ -115,6 +175,36 @@ class ProportionalLightCoordinator:
         """Return maximum color temperature."""
         return self._max_color_temp_kelvin
     
+    @property
+    def active_color_mode(self) -> ColorMode:
+        """Return the color mode the group currently reports."""
+        if self._active_color_mode is None:
+            self._active_color_mode = self._compute_color_mode()
+        return self._active_color_mode
+    
+    def _compute_color_mode(self) -> ColorMode:
+        """Derive the current color mode from the group state."""
+        # Return the current active color mode based on what's set
+        if self.hs_color:
+            return self._HS
+        if self.color_temp_kelvin:
+            return self._CT
+        if self._brightness is not None:
+            return self._BR
+        # Default fallback - return the "best" supported mode in order of preference
+        supported = self._supported_color_modes
+        if not supported:
+            return self._BR
+        for mode in (self._HS, self._CT, self._BR):
+            if mode in supported:
+                return mode
+        return next(iter(supported))
+    
+    @property
+    def aggregated_features(self) -> LightEntityFeature:
+        """Return the light features supported by the members (e.g. transition)."""
+        return self._aggregated_features
+    
     async def async_setup(self) -> None:
         """Setup the coordinator."""
         # Track state changes for all member entities
@@ -133,108 +223,169 @@ class ProportionalLightCoordinator:
     
     async def async_unload(self) -> None:
         """Unload the coordinator."""
+        if self._pending_handle:
+            self._pending_handle.cancel()
+            self._pending_handle = None
+        if self._settle_handle:
+            self._settle_handle.cancel()
+            self._settle_handle = None
         if self._unsub_state_listener:
             self._unsub_state_listener()
         if self._unsub_update_listener:
             self._unsub_update_listener()
+        # Release the member attribute mappings held for the comparison
+        self._supported_features_cache = None
     
     def add_update_callback(self, callback: Callable[[], None]) -> None:
         """Add a callback to be called when state updates."""
-        self._update_callbacks.append(callback)
+        self._update_callbacks.add(callback)
     
     def remove_update_callback(self, callback: Callable[[], None]) -> None:
         """Remove a callback."""
-        if callback in self._update_callbacks:
-            self._update_callbacks.remove(callback)
+        self._update_callbacks.discard(callback)
     
     @callback
     def _state_listener(self, event) -> None:
         """Handle state changes from member entities."""
-        entity_id = event.data.get('entity_id')
-        new_state = event.data.get('new_state')
-        old_state = event.data.get('old_state')
-        _LOGGER.debug(f"State change detected for {entity_id}")
-        if new_state and old_state:
-            old_brightness = old_state.attributes.get(ATTR_BRIGHTNESS) if old_state else None
-            new_brightness = new_state.attributes.get(ATTR_BRIGHTNESS) if new_state else None
-            _LOGGER.debug(f"  State: {old_state.state if old_state else 'None'} -> {new_state.state}")
-            _LOGGER.debug(f"  Brightness: {old_brightness} -> {new_brightness}")
-        # Schedule async update
-        self.hass.async_create_task(self._handle_state_change())
-    
-    async def _handle_state_change(self) -> None:
-        """Handle state changes with a small delay for state consistency."""
+        # Any member change invalidates the cached states
+        self._snapshot = None
+        # Changes caused by one of our own commands are folded into a single
+        # recompute once the command's window has expired
+        if self._suppress_until is not None and self.hass.loop.time() < self._suppress_until:
+            if self._settle_handle is None:
+                self._settle_handle = self.hass.loop.call_at(
+                    self._suppress_until, self._handle_command_settled
+                )
+            return
+        get = event.data.get
+        new_state = get('new_state')
+        old_state = get('old_state')
+        # Skip building the debug messages on the hot path unless they are emitted
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            _LOGGER.debug("State change detected for %s", get('entity_id'))
+            if new_state and old_state:
+                _LOGGER.debug("  State: %s -> %s", old_state.state, new_state.state)
+                _LOGGER.debug("  Brightness: %s -> %s", old_state.attributes.get(ATTR_BRIGHTNESS), new_state.attributes.get(ATTR_BRIGHTNESS))
+        # Only recompute when something we actually use changed
+        if new_state is not None and old_state is not None and new_state.state == old_state.state:
+            old_attrs = old_state.attributes
+            new_attrs = new_state.attributes
+            for attr in self._TRACKED_ATTRS:
+                if old_attrs.get(attr) != new_attrs.get(attr):
+                    break
+            else:
+                return
+        # Coalesce bursts of state changes into a single update - an already
+        # pending timer will pick up this change as well
+        if self._pending_handle is None or self._pending_handle.cancelled():
+            self._pending_handle = self.hass.loop.call_later(
+                STATE_CHANGE_DEBOUNCE, self._handle_state_change
+            )
+    
+    @callback
+    def _handle_state_change(self) -> None:
+        """Handle a (coalesced) burst of state changes once the debounce timer fired."""
+        self._pending_handle = None
         _LOGGER.debug("_handle_state_change called - updating coordinator state")
-        # Small delay to ensure the state has been updated in HA
-        await asyncio.sleep(0.05)
         
         # Clear group targets when lights change externally (not from our commands)
         # This makes the group show the averaged color from individual light changes
         self.clear_group_targets()
         
-        await self.async_update_state()
-        self._notify_callbacks()
-        _LOGGER.debug("_handle_state_change completed - callbacks notified")
+        # The recompute only reads the state machine, so it runs right here
+        # in the timer callback without wrapping it in a task
+        self._compute_state()
+        if self._notify_if_changed():
+            _LOGGER.debug("_handle_state_change completed - callbacks notified")
+    
+    @callback
+    def _handle_command_settled(self) -> None:
+        """Recompute once after the state changes caused by our own command."""
+        self._settle_handle = None
+        # The group targets were just set by that command, so they are kept
+        self._compute_state()
+        self._notify_if_changed()
     
     async def _config_entry_updated(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
         """Handle config entry updates."""
-        old_entities = set(self._entities)
-        new_entities = set(entry.data.get(CONF_ENTITIES, []))
+        old_entities_set = self._entities_set
         
-        self._entities = entry.data.get(CONF_ENTITIES, [])
-        self._hue_offsets = entry.data.get(CONF_HUE_OFFSETS, {})
+        data = entry.data
+        self._entities = tuple(data.get(CONF_ENTITIES, []))
+        self._entities_set = frozenset(self._entities)
+        self._hue_offsets = _active_hue_offsets(data.get(CONF_HUE_OFFSETS, {}))
+        self._snapshot = None
+        self._supported_features_cache = None
         
         # If entities changed, we need to re-setup state tracking
-        if old_entities != new_entities:
+        if old_entities_set != self._entities_set:
             # Schedule a full reload to restart with new entity tracking
             await self.hass.config_entries.async_reload(entry.entry_id)
         else:
             # Just update state if only settings changed
             await self.async_update_state()
-            self._notify_callbacks()
     
-    async def async_update_state(self) -> None:
-        """Update the calculated state based on member entities."""
+    def snapshot(self) -> tuple[list[State], list[State]]:
+        """Return (states, on_states) of the members, reusing the last update's lookup."""
+        if self._snapshot is None:
+            self._snapshot = split_states(self.hass, self._entities)
+        return self._snapshot
+    
+    async def async_update_state(self) -> bool:
+        """Update the calculated state based on member entities.
+        
+        Returns True if the observable state changed and callbacks were notified.
+        """
+        self._compute_state()
+        return self._notify_if_changed()
+    
+    @callback
+    def _compute_state(self) -> None:
+        """Recalculate the group state from member entities (no I/O)."""
+        self._active_color_mode = None
         _LOGGER.debug("Updating coordinator state")
         
-        states = filter_valid_states(self.hass, self._entities)
+        # Always read fresh states here, the result is reused by snapshot()
+        self._snapshot = split_states(self.hass, self._entities)
+        states, on_states = self._snapshot
         if not states:
             self._reset_state()
             return
         
-        # Get currently ON lights
-        on_states = get_on_states(states)
         self._is_on = len(on_states) > 0
         
-        _LOGGER.debug(f"Found {len(on_states)} lights ON out of {len(states)} total")
+        _LOGGER.debug("Found %s lights ON out of %s total", len(on_states), len(states))
         
         # Debug: Log all entity states  
-        for state in states:
-            brightness = state.attributes.get(ATTR_BRIGHTNESS, "No brightness attr")
-            _LOGGER.debug(f"Entity {state.entity_id}: state={state.state}, brightness={brightness}")
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            for state in states:
+                brightness = state.attributes.get(ATTR_BRIGHTNESS, "No brightness attr")
+                _LOGGER.debug("Entity %s: state=%s, brightness=%s", state.entity_id, state.state, brightness)
         
         if self._is_on:
             # Calculate state from ON lights
             old_brightness = self._brightness
             self._brightness = calculate_group_brightness(on_states, self._brightness_proportions)
-            _LOGGER.debug(f"Coordinator brightness updated: {old_brightness} -> {self._brightness}")
+            _LOGGER.debug("Coordinator brightness updated: %s -> %s", old_brightness, self._brightness)
             
             # Update brightness proportions based on current state
             # This captures the natural proportions when lights change externally
             if self._brightness and self._brightness > 0:
+                group_brightness = self._brightness
+                stored_proportions = self._brightness_proportions
                 current_proportions = {}
+                changed = not stored_proportions
                 for s in on_states:
-                    brightness = s.attributes.get(ATTR_BRIGHTNESS, 255)
-                    proportion = brightness / self._brightness
+                    proportion = s.attributes.get(ATTR_BRIGHTNESS, 255) / group_brightness
                     current_proportions[s.entity_id] = proportion
+                    if not changed:
+                        stored = stored_proportions.get(s.entity_id)
+                        changed = stored is None or abs(proportion - stored) > 0.05
                 
                 # Only update if proportions have meaningfully changed or are uninitialized
-                if not self._brightness_proportions or any(
-                    abs(current_proportions.get(entity_id, 0) - self._brightness_proportions.get(entity_id, 0)) > 0.05
-                    for entity_id in current_proportions
-                ):
-                    self._brightness_proportions.update(current_proportions)
-                    _LOGGER.debug(f"Updated brightness proportions: {self._brightness_proportions}")
+                if changed:
+                    self._brightness_proportions = current_proportions
+                    _LOGGER.debug("Updated brightness proportions: %s", self._brightness_proportions)
             
             old_hs_color = self._hs_color
             old_color_temp = self._color_temp_kelvin
@@ -243,12 +394,12 @@ class ProportionalLightCoordinator:
                 calculate_average_color(on_states, self._hue_offsets)
             )
             
-            _LOGGER.debug(f"Coordinator color updated:")
-            _LOGGER.debug(f"  HS color: {old_hs_color} -> {self._hs_color}")
-            _LOGGER.debug(f"  Color temp: {old_color_temp} -> {self._color_temp_kelvin}")
+            _LOGGER.debug("Coordinator color updated:")
+            _LOGGER.debug("  HS color: %s -> %s", old_hs_color, self._hs_color)
+            _LOGGER.debug("  Color temp: %s -> %s", old_color_temp, self._color_temp_kelvin)
             
             # Also log what the entity will see
-            _LOGGER.debug(f"Entity will now have: hs_color={self._hs_color}, color_temp_kelvin={self._color_temp_kelvin}")
+            _LOGGER.debug("Entity will now have: hs_color=%s, color_temp_kelvin=%s", self._hs_color, self._color_temp_kelvin)
         else:
             # All lights are off
             _LOGGER.debug("All lights are off, resetting brightness to None")
@@ -258,23 +409,39 @@ class ProportionalLightCoordinator:
         
         # Update supported features from all entities
         # Debug: Log what each entity reports for supported features
-        _LOGGER.debug("Checking supported features from member entities:")
-        for state in states:
-            supported_color_modes = state.attributes.get("supported_color_modes", "MISSING")
-            supported_features = state.attributes.get("supported_features", "MISSING")
-            _LOGGER.debug(f"  {state.entity_id}: color_modes={supported_color_modes}, features={supported_features}")
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            _LOGGER.debug("Checking supported features from member entities:")
+            for state in states:
+                supported_color_modes = state.attributes.get("supported_color_modes", "MISSING")
+                supported_features = state.attributes.get("supported_features", "MISSING")
+                _LOGGER.debug("  %s: color_modes=%s, features=%s", state.entity_id, supported_color_modes, supported_features)
         
         (
             self._supported_color_modes,
             self._min_color_temp_kelvin,
             self._max_color_temp_kelvin,
-        ) = calculate_supported_features(states)
+        ) = self._supported_features(states)
+        self._aggregated_features = calculate_aggregated_features(states)
         
-        _LOGGER.debug(f"Calculated supported_color_modes: {self._supported_color_modes}")
-        _LOGGER.debug(f"Calculated temp range: {self._min_color_temp_kelvin} - {self._max_color_temp_kelvin}")
+        _LOGGER.debug("Calculated supported_color_modes: %s", self._supported_color_modes)
+        _LOGGER.debug("Calculated temp range: %s - %s", self._min_color_temp_kelvin, self._max_color_temp_kelvin)
+    
+    def _supported_features(self, states: list[State]) -> tuple[set[ColorMode], int | None, int | None]:
+        """Return calculate_supported_features(states), reused while no member attributes changed.
         
-        # Notify callbacks when supported features change
-        self._notify_callbacks()
+        Home Assistant keeps a state's attributes mapping when a write leaves the
+        attributes unchanged, so identity per member is enough to detect a change.
+        """
+        cached = self._supported_features_cache
+        if (
+            cached is not None
+            and len(cached[0]) == len(states)
+            and all(attrs is s.attributes and state == s.state for (attrs, state), s in zip(cached[0], states))
+        ):
+            return cached[1]
+        result = calculate_supported_features(states)
+        self._supported_features_cache = (tuple((s.attributes, s.state) for s in states), result)
+        return result
     
     def _reset_state(self) -> None:
         """Reset all state when no entities are available."""
@@ -285,6 +452,8 @@ class ProportionalLightCoordinator:
         self._supported_color_modes = set()
         self._min_color_temp_kelvin = None
         self._max_color_temp_kelvin = None
+        self._aggregated_features = LightEntityFeature(0)
+        self._active_color_mode = None
         
         # Clear group targets
         self._group_target_color = None
@@ -295,8 +464,9 @@ class ProportionalLightCoordinator:
         """Set the group target color (what user commanded, before offsets)."""
         self._group_target_color = hs_color
         self._group_target_temp_kelvin = None
+        self._active_color_mode = None
         self._last_command_was_color = True
-        _LOGGER.debug(f"Group target color set to: {hs_color}")
+        _LOGGER.debug("Group target color set to: %s", hs_color)
         
         # Schedule clearing targets after a delay to distinguish our commands from external changes
         self.hass.async_create_task(self._delayed_clear_targets())
@@ -305,21 +475,39 @@ class ProportionalLightCoordinator:
         """Set the group target color temperature (what user commanded)."""
         self._group_target_temp_kelvin = temp_kelvin
         self._group_target_color = None
+        self._active_color_mode = None
         self._last_command_was_color = False
-        _LOGGER.debug(f"Group target temp set to: {temp_kelvin}K")
+        _LOGGER.debug("Group target temp set to: %sK", temp_kelvin)
         
         # Schedule clearing targets after a delay
         self.hass.async_create_task(self._delayed_clear_targets())
     
+    def suppress_state_updates(self) -> None:
+        """Fold listener-driven updates of a running command into one recompute.
+        
+        The window expires on its own; blocking commands may end it early with
+        resume_state_updates.
+        """
+        self._suppress_until = self.hass.loop.time() + COMMAND_SUPPRESS_WINDOW
+    
+    def resume_state_updates(self) -> None:
+        """Resume listener-driven updates after a blocking command and its explicit update."""
+        self._suppress_until = None
+        # The explicit update already saw the changes the window recompute was armed for
+        if self._settle_handle is not None:
+            self._settle_handle.cancel()
+            self._settle_handle = None
+    
     def clear_group_targets(self) -> None:
         """Clear group targets when lights change externally."""
         self._group_target_color = None
         self._group_target_temp_kelvin = None
+        self._active_color_mode = None
         _LOGGER.debug("Group target colors cleared - showing averaged colors")
     
     async def _delayed_clear_targets(self) -> None:
         """Clear group targets after a delay, allowing our commands to settle."""
-        # Wait longer than the state change delay to let our commands settle
+        # Wait well past the state change debounce to let our commands settle
         await asyncio.sleep(2.0)  # 2 seconds should be enough for commands to apply
         
         # Only clear if no recent commands (avoid clearing during rapid user interaction)
@@ -328,7 +516,28 @@ class ProportionalLightCoordinator:
             self.clear_group_targets()
             self._notify_callbacks()
     
+    def _signature(self) -> tuple:
+        """Return the observable outputs used to detect no-op updates."""
+        return (
+            self._is_on,
+            self._brightness,
+            self.hs_color,
+            self.color_temp_kelvin,
+            frozenset(self._supported_color_modes),
+            self._min_color_temp_kelvin,
+            self._max_color_temp_kelvin,
+            self._aggregated_features,
+        )
+    
+    def _notify_if_changed(self) -> bool:
+        """Notify callbacks only if the observable state changed since the last notify."""
+        if self._signature() == self._last_signature:
+            return False
+        self._notify_callbacks()
+        return True
+    
     def _notify_callbacks(self) -> None:
         """Notify all registered callbacks of state changes."""
+        self._last_signature = self._signature()
         for callback in self._update_callbacks:
             callback()
\ No newline at end of file
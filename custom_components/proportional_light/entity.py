@@ -15,11 +15,10 @@ from homeassistant.components.light import (
 )
 from homeassistant.core import HomeAssistant
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import STATE_ON
 
 from .const import LOGGER_NAME
 from .coordinator import ProportionalLightCoordinator
-from .utils import filter_valid_states, get_on_states, add_color_attributes, calculate_proportional_brightness
+from .utils import add_color_attributes, calculate_proportional_brightness, rgb_to_hs
 
 _LOGGER = logging.getLogger(LOGGER_NAME)
 
@@ -35,14 +34,12 @@ class ProportionalLight(LightEntity):
         self._attr_name = entry.title
         self._attr_unique_id = entry.entry_id
         
-        # Ensure the entity gets registered in the light domain
-        # This helps with adaptive_lighting compatibility
-        safe_name = entry.title.lower().replace(' ', '_').replace('-', '_')
-        suggested_entity_id = f"light.{safe_name}"
+        # Extra state attributes, rebuilt only when one of their inputs changed
+        self._extra_state_attrs_inputs: tuple | None = None
+        self._extra_state_attrs_cache: dict[str, Any] | None = None
         
         # Note: Don't set entity_id directly as it can interfere with HA's entity registry
         # Instead, we'll rely on the platform and entity class to handle domain assignment
-        _LOGGER.debug(f"ProportionalLight entity initialized: suggested_entity_id={suggested_entity_id}")
     
     async def async_added_to_hass(self) -> None:
         """Run when entity is added to hass."""
@@ -52,36 +49,35 @@ class ProportionalLight(LightEntity):
         # Perform initial update
         self.async_write_ha_state()
         
-        # Debug logging to help diagnose adaptive_lighting integration issues
-        _LOGGER.info(f"ProportionalLight entity added: entity_id={self.entity_id}")
-        _LOGGER.info(f"  unique_id={self.unique_id}")
-        _LOGGER.info(f"  name={self.name}")
-        _LOGGER.info(f"  supported_color_modes={self.supported_color_modes}")
-        _LOGGER.info(f"  supported_features={self.supported_features}")
+        # Diagnostics for adaptive_lighting integration issues - only when debugging,
+        # the delayed check walks all light entities in the state machine
+        if not _LOGGER.isEnabledFor(logging.DEBUG):
+            return
+        
+        _LOGGER.debug(
+            "ProportionalLight entity added: entity_id=%s, unique_id=%s, name=%s, supported_color_modes=%s, supported_features=%s",
+            self.entity_id, self.unique_id, self.name, self.supported_color_modes, self.supported_features,
+        )
         
         # Schedule a delayed check to verify adaptive_lighting compatibility
         # (Can't check immediately as entity isn't fully registered yet)
         def delayed_check():
-            light_entities = self.hass.states.async_entity_ids("light")
-            if self.entity_id in light_entities:
-                _LOGGER.info(f"✅ Entity {self.entity_id} IS visible in light domain")
-                
-                # Test adaptive_lighting compatibility
-                state = self.hass.states.get(self.entity_id)
-                if state:
-                    supported_features_attr = state.attributes.get("supported_features", 0)
-                    supported_color_modes_attr = state.attributes.get("supported_color_modes", set())
-                    _LOGGER.info(f"Entity {self.entity_id} reports to HA:")
-                    _LOGGER.info(f"  supported_features: {supported_features_attr}")
-                    _LOGGER.info(f"  supported_color_modes: {supported_color_modes_attr}")
-                    
-                    # Test adaptive_lighting's _supported_features logic
-                    if supported_color_modes_attr:
-                        _LOGGER.info(f"✅ Entity should be compatible with adaptive_lighting")
-                    else:
-                        _LOGGER.error(f"❌ Entity has empty supported_color_modes - will be filtered out")
-            else:
-                _LOGGER.error(f"❌ Entity {self.entity_id} NOT visible in light domain!")
+            if self.entity_id not in self.hass.states.async_entity_ids("light"):
+                _LOGGER.debug("Entity %s NOT visible in light domain!", self.entity_id)
+                return
+            
+            _LOGGER.debug("Entity %s IS visible in light domain", self.entity_id)
+            # Test adaptive_lighting compatibility
+            state = self.hass.states.get(self.entity_id)
+            if state:
+                supported_color_modes_attr = state.attributes.get("supported_color_modes", set())
+                _LOGGER.debug(
+                    "Entity %s reports to HA: supported_features=%s, supported_color_modes=%s",
+                    self.entity_id, state.attributes.get("supported_features", 0), supported_color_modes_attr,
+                )
+                # Test adaptive_lighting's _supported_features logic
+                if not supported_color_modes_attr:
+                    _LOGGER.debug("Entity %s has empty supported_color_modes - will be filtered out by adaptive_lighting", self.entity_id)
         
         # Schedule the check for after the entity is fully registered
         self.hass.loop.call_later(2.0, delayed_check)
@@ -92,8 +88,12 @@ class ProportionalLight(LightEntity):
     
     def _handle_coordinator_update(self) -> None:
         """Handle updates from the coordinator."""
-        _LOGGER.debug(f"Entity {self._attr_name} received coordinator update - brightness: {self.coordinator.brightness}")
-        _LOGGER.debug(f"Entity {self._attr_name} coordinator now reports supported_color_modes: {self.coordinator.supported_color_modes}")
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            coordinator = self.coordinator
+            _LOGGER.debug("Entity %s received coordinator update - brightness: %s", self._attr_name, coordinator.brightness)
+            _LOGGER.debug("Entity %s coordinator now reports hs_color: %s, color_temp_kelvin: %s", self._attr_name, coordinator.hs_color, coordinator.color_temp_kelvin)
+            _LOGGER.debug("Entity %s coordinator now reports supported_color_modes: %s", self._attr_name, coordinator.supported_color_modes)
+        self._refresh_extra_state_attributes()
         self.async_write_ha_state()
     
     @property
@@ -109,90 +109,55 @@ class ProportionalLight(LightEntity):
     @property
     def hs_color(self) -> tuple[float, float] | None:
         """Return the hue and saturation color value [float, float]."""
-        color = self.coordinator.hs_color
-        if color != getattr(self, '_last_hs_color', None):
-            self._last_hs_color = color
-            _LOGGER.debug(f"Entity {self._attr_name} hs_color property returning: {color}")
-        return color
+        return self.coordinator.hs_color
 
     @property
     def color_temp_kelvin(self) -> int | None:
         """Return the CT color value in K."""
-        temp = self.coordinator.color_temp_kelvin
-        if temp != getattr(self, '_last_color_temp', None):
-            self._last_color_temp = temp
-            _LOGGER.debug(f"Entity {self._attr_name} color_temp_kelvin property returning: {temp}")
-        return temp
+        return self.coordinator.color_temp_kelvin
     
     @property
     def supported_color_modes(self) -> set[ColorMode] | None:
         """Flag supported color modes."""
-        modes = self.coordinator.supported_color_modes
-        _LOGGER.debug(f"Entity {self._attr_name} supported_color_modes property called, returning: {modes}")
-        return modes
+        return self.coordinator.supported_color_modes
     
     @property
-    def supported_features(self) -> int:
+    def supported_features(self) -> LightEntityFeature:
         """Return the supported features of the light."""
-        features = 0
-        
-        # Check if any of the underlying lights support transitions
-        if self.coordinator.entities:
-            for entity_id in self.coordinator.entities:
-                state = self.hass.states.get(entity_id)
-                if state:
-                    entity_features = state.attributes.get("supported_features", 0)
-                    if isinstance(entity_features, int) and entity_features & LightEntityFeature.TRANSITION:
-                        features |= LightEntityFeature.TRANSITION
-                        break
-        
-        # Always return at least some basic features to ensure compatibility
-        _LOGGER.debug(f"Entity {self._attr_name} calculated supported_features: {features}")
-        return features
+        # Aggregated by the coordinator on each member update
+        return self.coordinator.aggregated_features
     
     @property
     def extra_state_attributes(self) -> dict[str, Any] | None:
         """Return extra state attributes to help with adaptive_lighting compatibility."""
-        attrs = {}
+        if self._extra_state_attrs_inputs is None:
+            self._refresh_extra_state_attributes()
+        return self._extra_state_attrs_cache
+    
+    def _refresh_extra_state_attributes(self) -> None:
+        """Rebuild the extra state attributes if any of their inputs changed."""
+        min_kelvin = self.min_color_temp_kelvin
+        max_kelvin = self.max_color_temp_kelvin
+        inputs = (min_kelvin, max_kelvin)
+        if inputs == self._extra_state_attrs_inputs:
+            return
+        self._extra_state_attrs_inputs = inputs
         
-        # Ensure supported_color_modes and supported_features are explicitly available
-        if self.supported_color_modes:
-            attrs["supported_color_modes"] = list(self.supported_color_modes)
-        if self.supported_features:
-            attrs["supported_features"] = self.supported_features
-            
-        # Add color temperature range if available
-        if self.min_color_temp_kelvin:
-            attrs["min_color_temp_kelvin"] = self.min_color_temp_kelvin
-        if self.max_color_temp_kelvin:
-            attrs["max_color_temp_kelvin"] = self.max_color_temp_kelvin
+        # supported_color_modes and supported_features are already part of the
+        # state via LightEntity, so only the color temperature range is added here
+        # (LightEntity only reports it when COLOR_TEMP is a supported mode)
+        attrs = {}
+        if min_kelvin:
+            attrs["min_color_temp_kelvin"] = min_kelvin
+        if max_kelvin:
+            attrs["max_color_temp_kelvin"] = max_kelvin
             
-        return attrs if attrs else None
+        self._extra_state_attrs_cache = attrs if attrs else None
     
     @property
     def color_mode(self) -> ColorMode | None:
         """Return the color mode of the light."""
-        # Return the current active color mode based on what's set
-        if self.coordinator.hs_color:
-            return ColorMode.HS
-        elif self.coordinator.color_temp_kelvin:
-            return ColorMode.COLOR_TEMP
-        elif self.coordinator.brightness is not None:
-            return ColorMode.BRIGHTNESS
-        else:
-            # Default fallback - use the first supported mode
-            supported = self.coordinator.supported_color_modes
-            if supported:
-                # Return the "best" supported mode in order of preference
-                if ColorMode.HS in supported:
-                    return ColorMode.HS
-                elif ColorMode.COLOR_TEMP in supported:
-                    return ColorMode.COLOR_TEMP
-                elif ColorMode.BRIGHTNESS in supported:
-                    return ColorMode.BRIGHTNESS
-                else:
-                    return next(iter(supported))
-            return ColorMode.BRIGHTNESS
+        return self.coordinator.active_color_mode
     
     @property
     def min_color_temp_kelvin(self) -> int | None:
@@ -206,7 +171,7 @@ class ProportionalLight(LightEntity):
     
     async def async_turn_on(self, **kwargs: Any) -> None:
         """Turn on the proportional light group."""
-        states = filter_valid_states(self.hass, self.coordinator.entities)
+        states, on_states = self.coordinator.snapshot()
         if not states:
             return
         
@@ -218,54 +183,47 @@ class ProportionalLight(LightEntity):
             self.coordinator.set_group_target_color(kwargs[ATTR_HS_COLOR])
         elif ATTR_RGB_COLOR in kwargs:
             # Convert RGB to HS for consistent target storage
-            import colorsys
-            r, g, b = kwargs[ATTR_RGB_COLOR]
-            h_norm, s_norm, _ = colorsys.rgb_to_hsv(r/255.0, g/255.0, b/255.0)
-            h, s = h_norm * 360.0, s_norm * 100.0
-            self.coordinator.set_group_target_color((h, s))
+            self.coordinator.set_group_target_color(rgb_to_hs(*kwargs[ATTR_RGB_COLOR]))
         elif ATTR_COLOR_TEMP_KELVIN in kwargs:
             self.coordinator.set_group_target_temp(kwargs[ATTR_COLOR_TEMP_KELVIN])
         
-        # Get currently ON lights
-        on_states = get_on_states(states)
-        
+        # The calls below do not block, so the members' state changes arrive
+        # after they return - the window is left to expire and folds them into
+        # a single recompute
+        self.coordinator.suppress_state_updates()
         if not on_states:
             # No lights are on - turn on all lights
             brightness = target_brightness or 255
-            await self._apply_to_all_lights(states, brightness, **kwargs)
+            await self._apply_to_all_lights(states, brightness, kwargs)
         else:
             # Some lights are on - apply settings to ON lights only
             brightness = target_brightness or self.coordinator.brightness or 255
-            await self._apply_to_on_lights(on_states, brightness, **kwargs)
+            await self._apply_to_on_lights(on_states, brightness, kwargs)
         
-        # Update coordinator state
+        # Update coordinator state (publishes the new group target right away)
         await self.coordinator.async_update_state()
     
     async def async_turn_off(self, **kwargs: Any) -> None:
         """Turn off all lights in the group."""
-        if self.coordinator.entities:
-            await self.hass.services.async_call(
-                "light", "turn_off", {"entity_id": self.coordinator.entities}, blocking=True
-            )
-        
-        # Update coordinator state
-        await self.coordinator.async_update_state()
+        self.coordinator.suppress_state_updates()
+        try:
+            if self.coordinator.entities:
+                await self.hass.services.async_call(
+                    "light", "turn_off", {"entity_id": list(self.coordinator.entities)}, blocking=True
+                )
+            
+            # Update coordinator state
+            await self.coordinator.async_update_state()
+        finally:
+            self.coordinator.resume_state_updates()
     
-    async def _apply_to_all_lights(self, states, brightness: int, **kwargs) -> None:
+    async def _apply_to_all_lights(self, states, brightness: int, kwargs: dict[str, Any]) -> None:
         """Apply settings to all lights with the same brightness."""
-        service_calls = []
-        for state in states:
-            service_data = {"entity_id": state.entity_id, ATTR_BRIGHTNESS: brightness}
-            add_color_attributes(service_data, state.entity_id, self.coordinator.hue_offsets, **kwargs)
-            service_calls.append(
-                self.hass.services.async_call("light", "turn_on", service_data, blocking=False)
-            )
-        
-        # Execute all service calls concurrently
-        if service_calls:
-            await asyncio.gather(*service_calls)
+        await self._async_turn_on_lights(
+            {state.entity_id: brightness for state in states}, kwargs
+        )
     
-    async def _apply_to_on_lights(self, on_states, target_brightness: int, **kwargs) -> None:
+    async def _apply_to_on_lights(self, on_states, target_brightness: int, kwargs: dict[str, Any]) -> None:
         """Apply settings to currently ON lights with proportional brightness scaling."""
         # Calculate proportional brightness for each light using stored proportions
         proportional_brightnesses, updated_proportions = calculate_proportional_brightness(
@@ -275,19 +233,47 @@ class ProportionalLight(LightEntity):
         # Update coordinator with new proportions (for when we're setting the brightness)
         self.coordinator._brightness_proportions.update(updated_proportions)
         
-        _LOGGER.debug(f"Applying proportional brightness: target_avg={target_brightness}")
-        for entity_id, brightness in proportional_brightnesses.items():
-            _LOGGER.debug(f"  {entity_id}: {brightness}")
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            _LOGGER.debug("Applying proportional brightness: target_avg=%s", target_brightness)
+            for entity_id, brightness in proportional_brightnesses.items():
+                _LOGGER.debug("  %s: %s", entity_id, brightness)
+        
+        # Keyed by exactly the entities of on_states
+        await self._async_turn_on_lights(proportional_brightnesses, kwargs)
+    
+    async def _async_turn_on_lights(self, brightnesses: dict[str, int], kwargs: dict[str, Any]) -> None:
+        """Turn on lights with the given per-light brightness.
+        
+        Lights ending up with identical service data (same brightness and same
+        color attributes after hue offsets) are batched into a single service call.
+        """
+        hue_offsets = self.coordinator.hue_offsets
+        # Color attributes without an offset are the same for every light
+        common: dict[str, Any] | None = None
+        batches: dict[tuple, list[str]] = {}
+        for entity_id, brightness in brightnesses.items():
+            if entity_id in hue_offsets:
+                colors: dict[str, Any] = {}
+                add_color_attributes(colors, entity_id, hue_offsets, kwargs)
+            else:
+                if common is None:
+                    common = {}
+                    add_color_attributes(common, self.entity_id, {}, kwargs)
+                colors = common
+            batches.setdefault((brightness, tuple(colors.items())), []).append(entity_id)
         
-        service_calls = []
-        for state in on_states:
-            brightness = proportional_brightnesses.get(state.entity_id, target_brightness)
-            service_data = {"entity_id": state.entity_id, ATTR_BRIGHTNESS: brightness}
-            add_color_attributes(service_data, state.entity_id, self.coordinator.hue_offsets, **kwargs)
-            service_calls.append(
-                self.hass.services.async_call("light", "turn_on", service_data, blocking=False)
+        service_calls = [
+            self.hass.services.async_call(
+                "light",
+                "turn_on",
+                {"entity_id": entity_ids, ATTR_BRIGHTNESS: brightness, **dict(color_items)},
+                blocking=False,
             )
+            for (brightness, color_items), entity_ids in batches.items()
+        ]
         
-        # Execute all service calls concurrently
-        if service_calls:
-            await asyncio.gather(*service_calls)
\ No newline at end of file
+        # Execute all service calls concurrently (a single batch needs no gather)
+        if len(service_calls) == 1:
+            await service_calls[0]
+        elif service_calls:
+            await asyncio.gather(*service_calls)
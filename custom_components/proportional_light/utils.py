@@ -1,8 +1,9 @@
 """Utility functions for Proportional Light integration."""
 from __future__ import annotations
-from typing import Any
+from typing import Any, Iterable
+import functools
 import logging
-import colorsys
+import math
 
 from homeassistant.components.light import (
     ATTR_BRIGHTNESS,
@@ -13,16 +14,99 @@ from homeassistant.components.light import (
     ATTR_RGBWW_COLOR,
     ATTR_XY_COLOR,
     ColorMode,
+    LightEntityFeature,
 )
 from homeassistant.const import STATE_ON
 from homeassistant.core import State
-from homeassistant.util.color import color_temperature_to_rgb
-import math
+from homeassistant.util.color import color_hs_to_xy, color_temperature_to_rgb, color_xy_to_hs
 
 from .const import LOGGER_NAME
 
 _LOGGER = logging.getLogger(LOGGER_NAME)
 
+# Plain int for the per-member feature test, avoids enum operations in the loop
+_FEATURE_TRANSITION = int(LightEntityFeature.TRANSITION)
+
+# Color modes whose HS/RGB values are taken as the light's actual color (also used by the config flow)
+COLOR_MODES = frozenset({ColorMode.HS, ColorMode.XY, ColorMode.RGB, ColorMode.RGBW, ColorMode.RGBWW})
+
+# Color attributes accepted by add_color_attributes, in priority order
+_COLOR_KEYS = (
+    ATTR_HS_COLOR,
+    ATTR_COLOR_TEMP_KELVIN,
+    ATTR_RGB_COLOR,
+    ATTR_RGBW_COLOR,
+    ATTR_RGBWW_COLOR,
+    ATTR_XY_COLOR,
+)
+
+# Kelvin resolution of the cached temperature to HS conversion
+_KELVIN_BUCKET = 10
+
+def _kelvin_to_hs(kelvin: float) -> tuple[float, float]:
+    """Convert a color temperature to HS, bucketed so nearby values share a cache entry."""
+    return _kelvin_bucket_to_hs(int(kelvin) // _KELVIN_BUCKET * _KELVIN_BUCKET)
+
+
+@functools.lru_cache(maxsize=128)
+def _kelvin_bucket_to_hs(kelvin: int) -> tuple[float, float]:
+    """Convert a bucketed color temperature to HS, cached as lights report only a few distinct values."""
+    return rgb_to_hs(*color_temperature_to_rgb(kelvin))
+
+
+def rgb_to_hs(r: int, g: int, b: int) -> tuple[float, float]:
+    """Convert an RGB color (0..255 per channel) to hue (0..360) and saturation (0..100).
+    
+    Same result as colorsys.rgb_to_hsv without normalizing the channels first
+    or computing the discarded value component.
+    """
+    mx = max(r, g, b)
+    d = mx - min(r, g, b)
+    if d == 0:
+        return 0.0, 0.0
+    if mx == r:
+        h = ((g - b) / d) % 6
+    elif mx == g:
+        h = (b - r) / d + 2
+    else:
+        h = (r - g) / d + 4
+    return h * 60.0, d / mx * 100.0
+
+
+def _rgb_shift_hue(r: int, g: int, b: int, degrees: float) -> tuple[int, int, int]:
+    """Rotate the hue of an RGB color (0..255 per channel) keeping saturation and value.
+    
+    Closed-form HSV round trip: max and min channel stay as they are, only the
+    sector and the position of the middle channel move.
+    """
+    mx = max(r, g, b)
+    mn = min(r, g, b)
+    d = mx - mn
+    if d == 0:
+        # Grey has no hue to rotate
+        return int(r), int(g), int(b)
+    if mx == r:
+        h = ((g - b) / d) % 6
+    elif mx == g:
+        h = (b - r) / d + 2
+    else:
+        h = (r - g) / d + 4
+    h = (h + degrees / 60.0) % 6
+    sector = int(h)
+    f = h - sector
+    rising = mn + d * f
+    falling = mx - d * f
+    r_new, g_new, b_new = (
+        (mx, rising, mn),
+        (falling, mx, mn),
+        (mn, mx, rising),
+        (mn, falling, mx),
+        (rising, mn, mx),
+        (mx, mn, falling),
+    )[sector % 6]
+    return int(r_new), int(g_new), int(b_new)
+
+
 def calculate_group_brightness(on_states: list[State], stored_proportions: dict[str, float] | None = None) -> int | None:
     """Calculate group brightness as the highest brightness of any light.
     
@@ -32,10 +116,18 @@ def calculate_group_brightness(on_states: list[State], stored_proportions: dict[
     if not on_states:
         return None
     
-    brightness_values = [s.attributes.get(ATTR_BRIGHTNESS, 255) for s in on_states]
-    max_brightness = max(brightness_values) if brightness_values else None
+    # Single pass, one attribute lookup per light
+    max_brightness = None
+    for s in on_states:
+        brightness = s.attributes.get(ATTR_BRIGHTNESS, 255)
+        if brightness is not None and (max_brightness is None or brightness > max_brightness):
+            max_brightness = brightness
     
-    _LOGGER.debug(f"Group brightness from {len(on_states)} lights: {brightness_values} -> max: {max_brightness}")
+    if _LOGGER.isEnabledFor(logging.DEBUG):
+        _LOGGER.debug(
+            "Group brightness from %d lights: %s -> max: %s",
+            len(on_states), [s.attributes.get(ATTR_BRIGHTNESS, 255) for s in on_states], max_brightness,
+        )
     return max_brightness
 
 
@@ -62,35 +154,30 @@ def calculate_proportional_brightness(
         _LOGGER.debug("Target is 100% (255) - scaling proportionally to maximum")
         # If no stored proportions, calculate from current state
         if stored_proportions is None:
-            current_brightnesses = {}
-            for s in on_states:
-                current_brightnesses[s.entity_id] = s.attributes.get(ATTR_BRIGHTNESS, 255)
+            current_brightnesses = [s.attributes.get(ATTR_BRIGHTNESS, 255) for s in on_states]
             
             # Find the highest current brightness to use as scaling reference
-            max_current = max(current_brightnesses.values()) if current_brightnesses.values() else 255
-            if max_current == 0:
-                max_current = 255  # Avoid division by zero
+            # (255 if all are at 0, avoiding division by zero)
+            max_current = max(current_brightnesses) or 255
             
             # Scale all lights so the brightest one hits 255
-            proportions = {}
-            for entity_id, brightness in current_brightnesses.items():
-                proportions[entity_id] = brightness / max_current
-                
-            new_brightnesses = {}
-            for entity_id in entity_ids:
-                new_brightnesses[entity_id] = int(255 * proportions[entity_id])
-                if new_brightnesses[entity_id] < 1:
-                    new_brightnesses[entity_id] = 1
+            proportions = {
+                entity_id: brightness / max_current
+                for entity_id, brightness in zip(entity_ids, current_brightnesses)
+            }
+            new_brightnesses = {
+                entity_id: max(1, int(255 * proportion))
+                for entity_id, proportion in proportions.items()
+            }
         else:
             # Use stored proportions, scale so highest proportion hits 255
-            max_proportion = max(stored_proportions.get(eid, 1.0) for eid in entity_ids)
             proportions = {entity_id: stored_proportions.get(entity_id, 1.0) for entity_id in entity_ids}
-            new_brightnesses = {}
-            for entity_id in entity_ids:
-                new_brightnesses[entity_id] = int(255 * (proportions[entity_id] / max_proportion))
-                if new_brightnesses[entity_id] < 1:
-                    new_brightnesses[entity_id] = 1
-                    
+            max_proportion = max(proportions.values()) or 1.0  # Avoid division by zero
+            new_brightnesses = {
+                entity_id: max(1, int(255 * (proportion / max_proportion)))
+                for entity_id, proportion in proportions.items()
+            }
+        
         return new_brightnesses, proportions
     
     # Special case: 0% means all lights at minimum  
@@ -107,60 +194,66 @@ def calculate_proportional_brightness(
     # Normal case: Proportional scaling
     # If no stored proportions, calculate from current state
     if stored_proportions is None:
-        current_brightnesses = {}
-        for s in on_states:
-            current_brightnesses[s.entity_id] = s.attributes.get(ATTR_BRIGHTNESS, 255)
+        current_brightnesses = [s.attributes.get(ATTR_BRIGHTNESS, 255) for s in on_states]
         
-        current_avg = sum(current_brightnesses.values()) / len(current_brightnesses)
-        _LOGGER.debug(f"Initializing proportions from current state (avg: {current_avg:.1f})")
+        current_avg = sum(current_brightnesses) / len(current_brightnesses)
+        _LOGGER.debug("Initializing proportions from current state (avg: %.1f)", current_avg)
         
         if current_avg == 0:
             # All lights at 0 - start with equal proportions
-            proportions = {entity_id: 1.0 for entity_id in entity_ids}
+            proportions = dict.fromkeys(entity_ids, 1.0)
             _LOGGER.debug("All lights at 0, using equal proportions (1.0 each)")
         else:
             # Calculate proportions relative to current average
-            proportions = {}
-            for entity_id, brightness in current_brightnesses.items():
-                proportions[entity_id] = brightness / current_avg
-                _LOGGER.debug(f"  {entity_id}: {brightness} / {current_avg:.1f} = {proportions[entity_id]:.3f}")
+            proportions = {
+                entity_id: brightness / current_avg
+                for entity_id, brightness in zip(entity_ids, current_brightnesses)
+            }
     else:
         # Use stored proportions, but only for entities that are currently on
         proportions = {entity_id: stored_proportions.get(entity_id, 1.0) for entity_id in entity_ids}
-        _LOGGER.debug(f"Using stored proportions: {proportions}")
+        _LOGGER.debug("Using stored proportions: %s", proportions)
     
-    # Calculate target brightness for each light based on stable proportions
-    new_brightnesses = {}
-    for entity_id in entity_ids:
-        # Calculate ideal brightness based on target and proportion
-        ideal_brightness = target_brightness * proportions[entity_id]
-        # Clamp to valid range
-        actual_brightness = max(1, min(255, int(ideal_brightness)))
-        new_brightnesses[entity_id] = actual_brightness
-        
-        _LOGGER.debug(f"  {entity_id}: target={target_brightness} × {proportions[entity_id]:.3f} = {ideal_brightness:.1f} -> {actual_brightness}")
+    # Calculate target brightness for each light based on stable proportions,
+    # clamped to the valid range
+    new_brightnesses = {
+        entity_id: max(1, min(255, int(target_brightness * proportion)))
+        for entity_id, proportion in proportions.items()
+    }
     
-    # Verify the result
-    actual_avg = sum(new_brightnesses.values()) / len(new_brightnesses)
-    _LOGGER.debug(f"Target brightness: {target_brightness}, achieved: {actual_avg:.1f}")
+    # Per-light results and the achieved average are only needed for the log
+    if _LOGGER.isEnabledFor(logging.DEBUG):
+        for entity_id, proportion in proportions.items():
+            _LOGGER.debug("  %s: target=%s × %.3f -> %s", entity_id, target_brightness, proportion, new_brightnesses[entity_id])
+        actual_avg = sum(new_brightnesses.values()) // len(new_brightnesses)
+        _LOGGER.debug("Target brightness: %s, achieved: %s", target_brightness, actual_avg)
     
     return new_brightnesses, proportions
 
 
 def _simple_color_average(colors: list[tuple[float, float]]) -> tuple[tuple[float, float], None, None]:
-    """Simple color averaging using Home Assistant's approach.
+    """Simple color averaging of hue and saturation values.
     
-    Just average the hue and saturation values - let HA handle the complexity.
-    This creates intuitive results like blue + red = purple.
+    Hue is an angle, so it is averaged as a circular mean (saturation-weighted
+    sum of unit vectors) - this creates intuitive results like blue + red = purple
+    instead of wrapping through green. Saturation is averaged plainly.
     """
     if len(colors) == 1:
         return colors[0], None, None
     
-    # Simple averaging - works well for most cases
-    avg_h = sum(h for h, s in colors) / len(colors)
-    avg_s = sum(s for h, s in colors) / len(colors)
+    # Accumulate the hue vectors and saturation in one pass
+    cx = 0.0
+    cy = 0.0
+    total_s = 0.0
+    for h, s in colors:
+        rad = math.radians(h)
+        cx += s * math.cos(rad)
+        cy += s * math.sin(rad)
+        total_s += s
+    avg_h = math.degrees(math.atan2(cy, cx)) % 360
+    avg_s = total_s / len(colors)
     
-    _LOGGER.debug(f"Simple color average: {colors} -> HS({avg_h:.1f}, {avg_s:.1f})")
+    _LOGGER.debug("Simple color average: %s -> HS(%.1f, %.1f)", colors, avg_h, avg_s)
     return (avg_h, avg_s), None, None
 
 
@@ -172,115 +265,95 @@ def calculate_average_color(
         return None, None
 
     # Debug: Log all available attributes for each light
-    for s in on_states:
-        _LOGGER.debug(f"Light {s.entity_id} all attributes: {dict(s.attributes)}")
-        _LOGGER.debug(f"Light {s.entity_id} color attributes:")
-        for attr_name in [ATTR_HS_COLOR, ATTR_RGB_COLOR, ATTR_COLOR_TEMP_KELVIN, ATTR_XY_COLOR]:
-            attr_value = s.attributes.get(attr_name)
-            if attr_value is not None:
-                _LOGGER.debug(f"  {attr_name}: {attr_value}")
-            else:
-                _LOGGER.debug(f"  {attr_name}: None")
+    if _LOGGER.isEnabledFor(logging.DEBUG):
+        for s in on_states:
+            attrs = s.attributes
+            _LOGGER.debug("Light %s all attributes: %s", s.entity_id, attrs)
+            _LOGGER.debug("Light %s color attributes:", s.entity_id)
+            for attr_name in ('color_mode', ATTR_HS_COLOR, ATTR_RGB_COLOR, ATTR_COLOR_TEMP_KELVIN, ATTR_XY_COLOR):
+                _LOGGER.debug("  %s: %s", attr_name, attrs.get(attr_name))
     
     # Collect all colors from ON lights for averaging
-    import colorsys
     collected_colors = []  # List of (h, s) tuples
+    # Color temperature of the first light reporting one, used if no colors are found
+    fallback_kelvin = None
     
     for s in on_states:
-        # Check the actual color mode of the light to prioritize correctly
-        current_color_mode = s.attributes.get('color_mode')
-        _LOGGER.debug(f"Light {s.entity_id} current color_mode: {current_color_mode}")
+        # Look up every attribute used below once per light
+        attrs = s.attributes
+        hs_color = attrs.get(ATTR_HS_COLOR)
+        rgb_color = attrs.get(ATTR_RGB_COLOR)
+        xy_color = attrs.get(ATTR_XY_COLOR)
+        kelvin = attrs.get(ATTR_COLOR_TEMP_KELVIN)
+        color_temp = attrs.get('color_temp')
+        
+        if fallback_kelvin is None:
+            if kelvin:
+                fallback_kelvin = kelvin
+            elif color_temp:
+                # Some lights might use legacy 'color_temp' in mired instead of 'color_temp_kelvin'
+                fallback_kelvin = int(1000000 // color_temp) if color_temp > 0 else 3000
         
         # For lights with true color (not just color temperature), prioritize actual colors
         # even if they're currently in color_temp mode
-        supported_modes = s.attributes.get('supported_color_modes', [])
-        has_color_support = any(mode in supported_modes for mode in ['hs', 'xy', 'rgb'])
+        has_color_support = not COLOR_MODES.isdisjoint(attrs.get('supported_color_modes') or ())
         
         # If light supports colors and has actual color values (not just white), collect those
-        if has_color_support and s.attributes.get(ATTR_HS_COLOR):
-            h, sat = s.attributes.get(ATTR_HS_COLOR)
+        if has_color_support and hs_color:
+            h, sat = hs_color
             # Only use HS color if it has actual saturation (not just white light)
             if sat > 5:  # More than 5% saturation means it's actually colored
                 # Use the actual current color (what the light actually looks like)
-                _LOGGER.debug(f"Collecting HS color from {s.entity_id}: ({h:.1f}, {sat:.1f})")
+                _LOGGER.debug("Collecting HS color from %s: (%.1f, %.1f)", s.entity_id, h, sat)
                 collected_colors.append((h, sat))
             else:
-                _LOGGER.debug(f"Light {s.entity_id} has HS color but low saturation ({sat:.1f}%) - treating as white")
+                _LOGGER.debug("Light %s has HS color but low saturation (%.1f%%) - treating as white", s.entity_id, sat)
         
         # Try RGB color if available and no HS color was collected
-        elif s.attributes.get(ATTR_RGB_COLOR):
-            r, g, b = s.attributes.get(ATTR_RGB_COLOR)
+        elif rgb_color:
+            r, g, b = rgb_color
             # Check if it's actually colored (not just white)
             max_rgb = max(r, g, b)
             min_rgb = min(r, g, b)
             if max_rgb > 0 and (max_rgb - min_rgb) > 10:  # Some color variation
                 # Convert RGB to HS for consistency
-                h_norm, s_norm, _ = colorsys.rgb_to_hsv(r/255.0, g/255.0, b/255.0)
-                h = h_norm * 360.0
-                sat = s_norm * 100.0
-                _LOGGER.debug(f"Collecting RGB color from {s.entity_id}: RGB({r},{g},{b}) -> HS({h:.1f}, {sat:.1f})")
+                h, sat = rgb_to_hs(r, g, b)
+                _LOGGER.debug("Collecting RGB color from %s: RGB(%s,%s,%s) -> HS(%.1f, %.1f)", s.entity_id, r, g, b, h, sat)
                 collected_colors.append((h, sat))
             else:
-                _LOGGER.debug(f"Light {s.entity_id} has RGB color but appears white: RGB({r},{g},{b})")
+                _LOGGER.debug("Light %s has RGB color but appears white: RGB(%s,%s,%s)", s.entity_id, r, g, b)
         
         # Try XY color
-        elif s.attributes.get(ATTR_XY_COLOR):
-            x, y = s.attributes.get(ATTR_XY_COLOR)
-            _LOGGER.debug(f"Found XY color from {s.entity_id}: ({x:.3f}, {y:.3f}) - skipping for now")
+        elif xy_color:
+            x, y = xy_color
+            _LOGGER.debug("Found XY color from %s: (%.3f, %.3f) - skipping for now", s.entity_id, x, y)
             # For now, skip XY colors and continue to next light
             continue
         
         # If no actual color found, try to convert Kelvin temperature to color
-        elif s.attributes.get(ATTR_COLOR_TEMP_KELVIN):
-            kelvin = s.attributes.get(ATTR_COLOR_TEMP_KELVIN)
+        elif kelvin:
             # Convert Kelvin to RGB using Home Assistant utility, then to HS for averaging
-            rgb = color_temperature_to_rgb(kelvin)
-            h_norm, s_norm, _ = colorsys.rgb_to_hsv(rgb[0]/255.0, rgb[1]/255.0, rgb[2]/255.0)
-            h = h_norm * 360.0
-            sat = s_norm * 100.0
-            _LOGGER.debug(f"Converting Kelvin from {s.entity_id}: {kelvin}K -> RGB{rgb} -> HS({h:.1f}, {sat:.1f})")
+            h, sat = _kelvin_to_hs(kelvin)
+            _LOGGER.debug("Converting Kelvin from %s: %sK -> HS(%.1f, %.1f)", s.entity_id, kelvin, h, sat)
             collected_colors.append((h, sat))
-        elif s.attributes.get('color_temp'):
+        elif color_temp:
             # Legacy color_temp in mired
-            color_temp = s.attributes.get('color_temp')
-            kelvin = int(1000000 / color_temp) if color_temp > 0 else 3000
-            rgb = color_temperature_to_rgb(kelvin)
-            h_norm, s_norm, _ = colorsys.rgb_to_hsv(rgb[0]/255.0, rgb[1]/255.0, rgb[2]/255.0)
-            h = h_norm * 360.0
-            sat = s_norm * 100.0
-            _LOGGER.debug(f"Converting legacy color_temp from {s.entity_id}: {color_temp} mired ({kelvin}K) -> RGB{rgb} -> HS({h:.1f}, {sat:.1f})")
+            kelvin = int(1000000 // color_temp) if color_temp > 0 else 3000
+            h, sat = _kelvin_to_hs(kelvin)
+            _LOGGER.debug("Converting legacy color_temp from %s: %s mired (%sK) -> HS(%.1f, %.1f)", s.entity_id, color_temp, kelvin, h, sat)
             collected_colors.append((h, sat))
     
     # If we collected any colors, average them intelligently
     if collected_colors:
-        _LOGGER.debug(f"Averaging {len(collected_colors)} colors: {collected_colors}")
+        _LOGGER.debug("Averaging %s colors: %s", len(collected_colors), collected_colors)
         
         avg_color, _, _ = _simple_color_average(collected_colors)
         return avg_color, None
     
-    # Second pass: use color temperature if no actual colors found
-    for s in on_states:
-        if s.attributes.get(ATTR_COLOR_TEMP_KELVIN):
-            kelvin = s.attributes.get(ATTR_COLOR_TEMP_KELVIN)
-            _LOGGER.debug(f"Using color temperature from {s.entity_id}: {kelvin}K")
-            return None, kelvin
-        elif s.attributes.get('color_temp'):
-            # Some lights might use 'color_temp' instead of 'color_temp_kelvin'
-            color_temp = s.attributes.get('color_temp')
-            _LOGGER.debug(f"Found legacy color_temp from {s.entity_id}: {color_temp} (conversion needed)")
-            # Convert mired to kelvin if needed
-            if color_temp:
-                kelvin = int(1000000 / color_temp) if color_temp > 0 else 3000
-                _LOGGER.debug(f"Converted to kelvin: {kelvin}K")
-                return None, kelvin
-    
-    # If no colors found, try averaging color temperatures
-    kelvin_values = [s.attributes.get(ATTR_COLOR_TEMP_KELVIN) for s in on_states 
-                    if s.attributes.get(ATTR_COLOR_TEMP_KELVIN)]
-    if kelvin_values:
-        avg_kelvin = int(sum(kelvin_values) / len(kelvin_values))
-        _LOGGER.debug(f"Averaged {len(kelvin_values)} kelvin values: {avg_kelvin}K")
-        return None, avg_kelvin
+    # Otherwise use the color temperature if any light reported one
+    if fallback_kelvin is not None:
+        _LOGGER.debug("Using color temperature: %sK", fallback_kelvin)
+        return None, fallback_kelvin
     
     # Final fallback - if no color information at all, provide a default warm white color
     _LOGGER.debug("No color information found, using default warm white (3000K)")
@@ -289,40 +362,38 @@ def calculate_average_color(
 
 def calculate_supported_features(states: list[State]) -> tuple[set[ColorMode], int | None, int | None]:
     """Calculate supported color modes and temperature ranges from all entities."""
-    import logging
-    
-    _LOGGER = logging.getLogger(__name__)
     modes = set()
-    min_kelvin_values = []
-    max_kelvin_values = []
+    # Running intersection of all temperature ranges
+    min_kelvin = None
+    max_kelvin = None
     
-    _LOGGER.debug(f"calculate_supported_features called with {len(states)} states")
+    _LOGGER.debug("calculate_supported_features called with %s states", len(states))
     
     for s in states:
+        attrs = s.attributes
         # Collect supported color modes
-        entity_modes = s.attributes.get("supported_color_modes")
-        _LOGGER.debug(f"Entity {s.entity_id} reports supported_color_modes: {entity_modes}")
-        
+        entity_modes = attrs.get("supported_color_modes")
         if entity_modes:
-            modes.update(entity_modes)
+            # Normalize to ColorMode members so the set never mixes enums and strings
+            for mode in entity_modes:
+                try:
+                    modes.add(ColorMode(mode))
+                except ValueError:
+                    _LOGGER.debug("Ignoring unknown color mode %s of %s", mode, s.entity_id)
         else:
             # Fallback: try to infer from state attributes
-            _LOGGER.debug(f"No supported_color_modes found, inferring from attributes")
-            if s.attributes.get("hs_color") is not None:
+            if attrs.get("hs_color") is not None:
                 modes.add(ColorMode.HS)
-                _LOGGER.debug(f"  Added HS mode (has hs_color)")
-            if s.attributes.get("color_temp_kelvin") is not None or s.attributes.get("color_temp") is not None:
+            if attrs.get("color_temp_kelvin") is not None or attrs.get("color_temp") is not None:
                 modes.add(ColorMode.COLOR_TEMP)
-                _LOGGER.debug(f"  Added COLOR_TEMP mode (has color_temp)")
-            if s.attributes.get("brightness") is not None or s.state == "on":
+            if attrs.get("brightness") is not None or s.state == "on":
                 modes.add(ColorMode.BRIGHTNESS)
-                _LOGGER.debug(f"  Added BRIGHTNESS mode (has brightness or is on)")
         
         # Collect color temperature ranges
-        if s.attributes.get("min_color_temp_kelvin"):
-            min_kelvin_values.append(s.attributes["min_color_temp_kelvin"])
-        if s.attributes.get("max_color_temp_kelvin"):
-            max_kelvin_values.append(s.attributes["max_color_temp_kelvin"])
+        if (entity_min := attrs.get("min_color_temp_kelvin")) and (min_kelvin is None or entity_min > min_kelvin):
+            min_kelvin = entity_min
+        if (entity_max := attrs.get("max_color_temp_kelvin")) and (max_kelvin is None or entity_max < max_kelvin):
+            max_kelvin = entity_max
     
     # Clean up color modes
     if modes and ColorMode.ONOFF in modes and len(modes) > 1:
@@ -332,120 +403,125 @@ def calculate_supported_features(states: list[State]) -> tuple[set[ColorMode], i
         # Default to reasonable capabilities to ensure adaptive_lighting compatibility
         modes = {ColorMode.BRIGHTNESS, ColorMode.COLOR_TEMP}
     
-    _LOGGER.debug(f"Final calculated modes: {modes}")
-    
-    # Set temperature ranges (use the intersection of all ranges)
-    min_kelvin = max(min_kelvin_values) if min_kelvin_values else None
-    max_kelvin = min(max_kelvin_values) if max_kelvin_values else None
+    _LOGGER.debug("Final calculated modes: %s", modes)
     
     return modes, min_kelvin, max_kelvin
 
 
+def calculate_aggregated_features(states: list[State]) -> LightEntityFeature:
+    """Calculate the light features the group can offer from all entities."""
+    # Only transitions are passed through - if any member supports them
+    for s in states:
+        try:
+            if s.attributes.get("supported_features", 0) & _FEATURE_TRANSITION:
+                return LightEntityFeature.TRANSITION
+        except TypeError:
+            # Member reports something other than an int mask
+            continue
+    return LightEntityFeature(0)
+
+
+def _offset_hs(entity_id: str, value: tuple, offset: float) -> tuple:
+    """Apply a hue offset to an HS color."""
+    h, s = value
+    offset_h = (h + offset) % 360
+    _LOGGER.debug("Applied hue offset %s° to %s: %s° -> %s°", offset, entity_id, h, offset_h)
+    return (offset_h, s)
+
+
+def _offset_rgb(entity_id: str, value: tuple, offset: float) -> tuple:
+    """Apply a hue offset to an RGB color by rotating the hue in HSV space."""
+    r, g, b = value
+    r_new, g_new, b_new = _rgb_shift_hue(r, g, b, offset)
+    _LOGGER.debug("Applied hue offset %s° to %s: RGB(%s,%s,%s) -> RGB(%s,%s,%s)", offset, entity_id, r, g, b, r_new, g_new, b_new)
+    return (r_new, g_new, b_new)
+
+
+def _offset_rgbw(entity_id: str, value: tuple, offset: float) -> tuple:
+    """Apply a hue offset to the RGB part of an RGBW color."""
+    r, g, b, w = value
+    # Use RGB components for hue calculation (ignore white channel for hue)
+    if r + g + b <= 0:
+        # Pure white light - no hue to offset
+        _LOGGER.debug("Skipping hue offset for %s: RGBW(%s,%s,%s,%s) is pure white", entity_id, r, g, b, w)
+        return value
+    r_new, g_new, b_new = _rgb_shift_hue(r, g, b, offset)
+    _LOGGER.debug("Applied hue offset %s° to %s: RGBW(%s,%s,%s,%s) -> RGBW(%s,%s,%s,%s)", offset, entity_id, r, g, b, w, r_new, g_new, b_new, w)
+    return (r_new, g_new, b_new, w)
+
+
+def _offset_rgbww(entity_id: str, value: tuple, offset: float) -> tuple:
+    """Apply a hue offset to the RGB part of an RGBWW color."""
+    r, g, b, cw, ww = value
+    # Use RGB components for hue calculation (ignore white channels for hue)
+    if r + g + b <= 0:
+        # Pure white light - no hue to offset
+        _LOGGER.debug("Skipping hue offset for %s: RGBWW(%s,%s,%s,%s,%s) is pure white", entity_id, r, g, b, cw, ww)
+        return value
+    r_new, g_new, b_new = _rgb_shift_hue(r, g, b, offset)
+    _LOGGER.debug("Applied hue offset %s° to %s: RGBWW(%s,%s,%s,%s,%s) -> RGBWW(%s,%s,%s,%s,%s)", offset, entity_id, r, g, b, cw, ww, r_new, g_new, b_new, cw, ww)
+    return (r_new, g_new, b_new, cw, ww)
+
+
+def _offset_xy(entity_id: str, value: tuple, offset: float) -> tuple:
+    """Apply a hue offset to an XY color by converting XY -> HS -> offset -> XY."""
+    x, y = value
+    try:
+        h, s = color_xy_to_hs(x, y)
+        offset_h = (h + offset) % 360
+        new_x, new_y = color_hs_to_xy(offset_h, s)
+    except Exception as e:
+        _LOGGER.warning("Failed to apply hue offset to XY color for %s: %s", entity_id, e)
+        return value
+    _LOGGER.debug("Applied hue offset %s° to %s: XY(%.3f,%.3f) -> HS(%.1f,%.1f) -> HS(%.1f,%.1f) -> XY(%.3f,%.3f)", offset, entity_id, x, y, h, s, offset_h, s, new_x, new_y)
+    return (new_x, new_y)
+
+
+# Hue offset handlers per color attribute - attributes without one (color
+# temperature) are passed through unchanged
+_HUE_OFFSET_HANDLERS = {
+    ATTR_HS_COLOR: _offset_hs,
+    ATTR_RGB_COLOR: _offset_rgb,
+    ATTR_RGBW_COLOR: _offset_rgbw,
+    ATTR_RGBWW_COLOR: _offset_rgbww,
+    ATTR_XY_COLOR: _offset_xy,
+}
+
+
 def add_color_attributes(
-    service_data: dict, entity_id: str, hue_offsets: dict[str, float], **kwargs
+    service_data: dict, entity_id: str, hue_offsets: dict[str, float], kwargs: dict[str, Any]
 ) -> None:
-    """Add color attributes to service data with hue offset support."""
-    import colorsys
+    """Add color attributes to service data with hue offset support.
     
-    _LOGGER.debug(f"add_color_attributes called for {entity_id} with hue_offsets: {hue_offsets}, kwargs: {kwargs}")
+    `kwargs` are the turn_on service arguments, passed as a read-only dict.
+    """
+    _LOGGER.debug("add_color_attributes called for %s with hue_offsets: %s, kwargs: %s", entity_id, hue_offsets, kwargs)
     
-    # Priority: hs_color > color_temp > other colors
-    if ATTR_HS_COLOR in kwargs:
-        if entity_id in hue_offsets:
-            # Apply hue offset for this specific entity
-            h, s = kwargs[ATTR_HS_COLOR]
-            offset_h = (h + hue_offsets[entity_id]) % 360
-            service_data[ATTR_HS_COLOR] = (offset_h, s)
-            _LOGGER.debug(f"Applied hue offset {hue_offsets[entity_id]}° to {entity_id}: {h}° -> {offset_h}°")
-        else:
-            service_data[ATTR_HS_COLOR] = kwargs[ATTR_HS_COLOR]
-    elif ATTR_COLOR_TEMP_KELVIN in kwargs:
-        service_data[ATTR_COLOR_TEMP_KELVIN] = kwargs[ATTR_COLOR_TEMP_KELVIN]
-    elif ATTR_RGB_COLOR in kwargs:
-        if entity_id in hue_offsets:
-            # Apply hue offset by converting RGB -> HS -> offset -> RGB
-            r, g, b = kwargs[ATTR_RGB_COLOR]
-            h_norm, s_norm, v_norm = colorsys.rgb_to_hsv(r/255.0, g/255.0, b/255.0)
-            h = h_norm * 360.0
-            offset_h = (h + hue_offsets[entity_id]) % 360
-            offset_h_norm = offset_h / 360.0
-            
-            # Convert back to RGB
-            r_new, g_new, b_new = colorsys.hsv_to_rgb(offset_h_norm, s_norm, v_norm)
-            service_data[ATTR_RGB_COLOR] = (int(r_new * 255), int(g_new * 255), int(b_new * 255))
-            _LOGGER.debug(f"Applied hue offset {hue_offsets[entity_id]}° to {entity_id}: RGB({r},{g},{b}) -> RGB({int(r_new * 255)},{int(g_new * 255)},{int(b_new * 255)})")
-        else:
-            service_data[ATTR_RGB_COLOR] = kwargs[ATTR_RGB_COLOR]
-    elif ATTR_RGBW_COLOR in kwargs:
-        if entity_id in hue_offsets:
-            # Apply hue offset by converting RGBW -> RGB -> HS -> offset -> RGB -> RGBW
-            r, g, b, w = kwargs[ATTR_RGBW_COLOR]
-            # Use RGB components for hue calculation (ignore white channel for hue)
-            if r + g + b > 0:  # Only apply offset if there's actual color (not just white)
-                h_norm, s_norm, v_norm = colorsys.rgb_to_hsv(r/255.0, g/255.0, b/255.0)
-                h = h_norm * 360.0
-                offset_h = (h + hue_offsets[entity_id]) % 360
-                offset_h_norm = offset_h / 360.0
-                
-                # Convert back to RGB while preserving brightness
-                r_new, g_new, b_new = colorsys.hsv_to_rgb(offset_h_norm, s_norm, v_norm)
-                service_data[ATTR_RGBW_COLOR] = (int(r_new * 255), int(g_new * 255), int(b_new * 255), w)
-                _LOGGER.debug(f"Applied hue offset {hue_offsets[entity_id]}° to {entity_id}: RGBW({r},{g},{b},{w}) -> RGBW({int(r_new * 255)},{int(g_new * 255)},{int(b_new * 255)},{w})")
-            else:
-                # Pure white light - no hue to offset
-                service_data[ATTR_RGBW_COLOR] = kwargs[ATTR_RGBW_COLOR]
-                _LOGGER.debug(f"Skipping hue offset for {entity_id}: RGBW({r},{g},{b},{w}) is pure white")
-        else:
-            service_data[ATTR_RGBW_COLOR] = kwargs[ATTR_RGBW_COLOR]
-    elif ATTR_RGBWW_COLOR in kwargs:
-        if entity_id in hue_offsets:
-            # Apply hue offset by converting RGBWW -> RGB -> HS -> offset -> RGB -> RGBWW
-            r, g, b, cw, ww = kwargs[ATTR_RGBWW_COLOR]
-            # Use RGB components for hue calculation (ignore white channels for hue)
-            if r + g + b > 0:  # Only apply offset if there's actual color (not just white)
-                h_norm, s_norm, v_norm = colorsys.rgb_to_hsv(r/255.0, g/255.0, b/255.0)
-                h = h_norm * 360.0
-                offset_h = (h + hue_offsets[entity_id]) % 360
-                offset_h_norm = offset_h / 360.0
-                
-                # Convert back to RGB while preserving brightness and white channels
-                r_new, g_new, b_new = colorsys.hsv_to_rgb(offset_h_norm, s_norm, v_norm)
-                service_data[ATTR_RGBWW_COLOR] = (int(r_new * 255), int(g_new * 255), int(b_new * 255), cw, ww)
-                _LOGGER.debug(f"Applied hue offset {hue_offsets[entity_id]}° to {entity_id}: RGBWW({r},{g},{b},{cw},{ww}) -> RGBWW({int(r_new * 255)},{int(g_new * 255)},{int(b_new * 255)},{cw},{ww})")
-            else:
-                # Pure white light - no hue to offset
-                service_data[ATTR_RGBWW_COLOR] = kwargs[ATTR_RGBWW_COLOR]
-                _LOGGER.debug(f"Skipping hue offset for {entity_id}: RGBWW({r},{g},{b},{cw},{ww}) is pure white")
-        else:
-            service_data[ATTR_RGBWW_COLOR] = kwargs[ATTR_RGBWW_COLOR]
-    elif ATTR_XY_COLOR in kwargs:
-        if entity_id in hue_offsets:
-            # Apply hue offset by converting XY -> HS -> offset -> XY
-            from homeassistant.util.color import color_xy_to_hs, color_hs_to_xy
-            x, y = kwargs[ATTR_XY_COLOR]
-            try:
-                # Convert XY to HS
-                h, s = color_xy_to_hs(x, y)
-                # Apply hue offset
-                offset_h = (h + hue_offsets[entity_id]) % 360
-                # Convert back to XY
-                new_x, new_y = color_hs_to_xy(offset_h, s)
-                service_data[ATTR_XY_COLOR] = (new_x, new_y)
-                _LOGGER.debug(f"Applied hue offset {hue_offsets[entity_id]}° to {entity_id}: XY({x:.3f},{y:.3f}) -> HS({h:.1f},{s:.1f}) -> HS({offset_h:.1f},{s:.1f}) -> XY({new_x:.3f},{new_y:.3f})")
-            except Exception as e:
-                _LOGGER.warning(f"Failed to apply hue offset to XY color for {entity_id}: {e}")
-                service_data[ATTR_XY_COLOR] = kwargs[ATTR_XY_COLOR]
-        else:
-            service_data[ATTR_XY_COLOR] = kwargs[ATTR_XY_COLOR]
-
-
-def filter_valid_states(hass, entity_ids: list[str]) -> list[State]:
-    """Get valid states for the given entity IDs."""
-    states = [hass.states.get(e) for e in entity_ids]
-    return [s for s in states if s]
-
+    # Priority: hs_color > color_temp > other colors - only the first one present is used
+    for attr in _COLOR_KEYS:
+        if attr in kwargs:
+            value = kwargs[attr]
+            break
+    else:
+        return
+    
+    # Zero offsets pass the color through unchanged
+    offset = hue_offsets.get(entity_id)
+    if offset and (handler := _HUE_OFFSET_HANDLERS.get(attr)):
+        value = handler(entity_id, value, offset)
+    service_data[attr] = value
 
-def get_on_states(states: list[State]) -> list[State]:
-    """Filter states to only include those that are on."""
-    return [s for s in states if s.state == STATE_ON]
 
+def split_states(hass, entity_ids: Iterable[str]) -> tuple[list[State], list[State]]:
+    """Get valid states and the subset that is on in a single pass."""
+    get = hass.states.get
+    on = STATE_ON
+    states = []
+    on_states = []
+    for entity_id in entity_ids:
+        state = get(entity_id)
+        if state:
+            states.append(state)
+            if state.state == on:
+                on_states.append(state)
+    return states, on_states